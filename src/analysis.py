@@ -15,12 +15,57 @@ Usage:
     print(df.groupby("provider")["chosen"].value_counts())
 """
 
-import json
 import os
+import sys
+from functools import lru_cache
 from pathlib import Path
 
 import pandas as pd
 
+sys.path.insert(0, ".")
+from src import jsonio
+
+
+# Column order of the long-format DataFrame (see load_results_to_dataframe docstring)
+_COLUMNS = [
+    "experiment_id", "provider", "model", "variant", "timestamp",
+    "product_id", "category", "price", "rating", "review_count",
+    "position", "page", "is_sponsored", "is_best_seller", "is_overall_pick",
+    "in_consideration", "chosen",
+]
+
+# What _iter_rows actually yields: the raw tag set travels as one column and
+# is expanded into the three flag columns after the frame is built.
+_RECORD_COLUMNS = [
+    "experiment_id", "provider", "model", "variant", "timestamp",
+    "product_id", "category", "price", "rating", "review_count",
+    "position", "page", "tags", "in_consideration", "chosen",
+]
+
+
+def _iter_result_files(results_dir, include_ablation):
+    """Yield result file paths lazily.
+
+    os.scandir with a name filter avoids materializing (and sorting) the full
+    directory listing up front; deterministic ordering is restored by the
+    final sort on the built DataFrame.
+    """
+    # Missing dirs yield nothing (like the old glob) — a pre-first-run
+    # invocation should print "No results found.", not raise
+    dirs = []
+    if os.path.isdir(results_dir):
+        dirs.append(results_dir)
+    if include_ablation:
+        ablation_dir = os.path.join(str(results_dir), "ablation")
+        if os.path.isdir(ablation_dir):
+            dirs.append(ablation_dir)
+
+    for d in dirs:
+        with os.scandir(d) as entries:
+            for entry in entries:
+                if entry.name.startswith("result_") and entry.name.endswith(".json") and entry.is_file():
+                    yield Path(entry.path)
+
 
 def load_results_to_dataframe(
     results_dir="data/results",
@@ -61,84 +106,134 @@ def load_results_to_dataframe(
             in_consideration bool  True if product was in the model's consideration set
             chosen          bool   True if product was the model's final choice
     """
-    rows = []
+    # Rows are streamed straight into from_records — no intermediate list of
+    # all rows, so peak memory is bounded by the frame itself, not 2x it.
+    df = pd.DataFrame.from_records(
+        _iter_rows(results_dir, experiments_dir, include_ablation),
+        columns=_RECORD_COLUMNS,
+    )
 
-    result_files = sorted(Path(results_dir).glob("result_*.json"))
-    if include_ablation:
-        ablation_dir = Path(results_dir) / "ablation"
-        if ablation_dir.exists():
-            result_files = sorted(result_files) + sorted(ablation_dir.glob("result_*.json"))
+    if df.empty:
+        print("No results found.")
+        return df.reindex(columns=_COLUMNS)
+
+    # Expand the tag sets into flag columns in one pass each, outside the
+    # per-product parsing loop
+    tags = df.pop("tags")
+    df["is_sponsored"] = [("Sponsored" in t) for t in tags]
+    df["is_best_seller"] = [("Best Seller" in t) for t in tags]
+    df["is_overall_pick"] = [("Overall Pick" in t) for t in tags]
+
+    # Coerce types
+    df["price"] = pd.to_numeric(df["price"], errors="coerce")
+    df["rating"] = pd.to_numeric(df["rating"], errors="coerce")
+    df["review_count"] = pd.to_numeric(df["review_count"], errors="coerce").astype("Int64")
+    df["position"] = pd.to_numeric(df["position"], errors="coerce").astype("Int64")
+    df["page"] = pd.to_numeric(df["page"], errors="coerce").astype("Int64")
+
+    # Low-cardinality string columns as category dtype: a fraction of the
+    # memory of object columns, and the groupbys in summary()/describe()
+    # run on integer codes instead of Python strings.
+    for col in ("experiment_id", "provider", "model", "variant", "category", "product_id"):
+        df[col] = df[col].astype("category")
+    # Flag columns come out of from_records as object; materialize as 1-byte bools
+    for col in ("is_sponsored", "is_best_seller", "is_overall_pick", "in_consideration", "chosen"):
+        df[col] = df[col].astype(bool)
+
+    # Restore the documented column order (flag columns were appended last)
+    df = df[_COLUMNS]
+
+    # scandir yields files in directory order; restore the deterministic
+    # ordering the old sorted-glob gave. Stable sort keeps batch order
+    # within each experiment.
+    df = df.sort_values("experiment_id", kind="stable", ignore_index=True)
+
+    return df
+
+
+@lru_cache(maxsize=None)
+def _load_batch(path):
+    """Parse one batch file, memoized.
+
+    Every model/variant run over a universe references the same batch files,
+    so N results pointing at one batch would otherwise re-read and re-parse
+    it N times. Callers must not mutate the returned list.
+    """
+    with open(path, "rb") as f:
+        return jsonio.loads(f.read())
 
-    for result_file in result_files:
-        with open(result_file) as f:
-            result = json.load(f)
+
+def _resolve_batch_path(source_batch, experiments_dir):
+    """Resolve a result's source_batch to a path that exists, or None.
+
+    Falls back to experiments_dir root, then any immediate subdirectory,
+    when the recorded path is stale (e.g. after moving files).
+    """
+    if os.path.exists(source_batch):
+        return source_batch
+    batch_filename = os.path.basename(source_batch)
+    candidate = os.path.join(experiments_dir, batch_filename)
+    if os.path.exists(candidate):
+        return candidate
+    for subdir in Path(experiments_dir).iterdir():
+        if subdir.is_dir():
+            candidate = str(subdir / batch_filename)
+            if os.path.exists(candidate):
+                return candidate
+    return None
+
+
+def _iter_rows(results_dir, experiments_dir, include_ablation):
+    """Yield one row tuple per product per result file (order of _RECORD_COLUMNS)."""
+    resolved = {}  # raw source_batch string → existing path or None
+
+    for result_file in _iter_result_files(results_dir, include_ablation):
+        with open(result_file, "rb") as f:
+            result = jsonio.loads(f.read())
 
         metadata = result.get("metadata", {})
-        source_batch = metadata.get("source_batch", "")
-
-        # Resolve batch file path — fall back to experiments_dir subdirs if needed
-        if not os.path.exists(source_batch):
-            batch_filename = os.path.basename(source_batch)
-            # Try experiments_dir root first, then any immediate subdirectory
-            candidate = os.path.join(experiments_dir, batch_filename)
-            if not os.path.exists(candidate):
-                for subdir in Path(experiments_dir).iterdir():
-                    if subdir.is_dir():
-                        candidate = str(subdir / batch_filename)
-                        if os.path.exists(candidate):
-                            break
-            source_batch = candidate
-
-        if not os.path.exists(source_batch):
+        raw_batch = metadata.get("source_batch", "")
+
+        # Results from the same universe share batch paths — resolve (and
+        # stat) each unique path once instead of once per result file.
+        if raw_batch not in resolved:
+            resolved[raw_batch] = _resolve_batch_path(raw_batch, experiments_dir)
+        source_batch = resolved[raw_batch]
+
+        if source_batch is None:
             print(f"  Warning: batch file not found for {result_file.name}, skipping.")
             continue
 
-        with open(source_batch) as f:
-            products = json.load(f)
+        products = _load_batch(source_batch)
 
         decision = result.get("decision", {})
         consideration_set = set(decision.get("consideration_set", []))
         final_choice = decision.get("final_choice")
         experiment_id = result_file.stem
 
+        # Per-result scalars, hoisted out of the per-product loop
+        provider = metadata.get("provider")
+        model = metadata.get("model")
+        variant = metadata.get("variant", "full")
+        timestamp = metadata.get("timestamp")
+
         for product in products:
             product_id = product.get("id")
-            tags = product.get("tags") or []
-
-            rows.append({
-                "experiment_id":   experiment_id,
-                "provider":        metadata.get("provider"),
-                "model":           metadata.get("model"),
-                "variant":         metadata.get("variant", "full"),
-                "timestamp":       metadata.get("timestamp"),
-                "product_id":      product_id,
-                "category":        product.get("category"),
-                "price":           product.get("price"),
-                "rating":          product.get("rating"),
-                "review_count":    product.get("review_count"),
-                "position":        product.get("position"),
-                "page":            product.get("page"),
-                "is_sponsored":    "Sponsored" in tags,
-                "is_best_seller":  "Best Seller" in tags,
-                "is_overall_pick": "Overall Pick" in tags,
-                "in_consideration": product_id in consideration_set,
-                "chosen":          product_id == final_choice,
-            })
-
-    df = pd.DataFrame(rows)
-
-    if df.empty:
-        print("No results found.")
-        return df
-
-    # Coerce types
-    df["price"] = pd.to_numeric(df["price"], errors="coerce")
-    df["rating"] = pd.to_numeric(df["rating"], errors="coerce")
-    df["review_count"] = pd.to_numeric(df["review_count"], errors="coerce").astype("Int64")
-    df["position"] = pd.to_numeric(df["position"], errors="coerce").astype("Int64")
-    df["page"] = pd.to_numeric(df["page"], errors="coerce").astype("Int64")
-
-    return df
+            tags = frozenset(product.get("tags") or ())
+
+            yield (
+                experiment_id, provider, model, variant, timestamp,
+                product_id,
+                product.get("category"),
+                product.get("price"),
+                product.get("rating"),
+                product.get("review_count"),
+                product.get("position"),
+                product.get("page"),
+                tags,
+                product_id in consideration_set,
+                product_id == final_choice,
+            )
 
 
 def summary(df, category=None):
@@ -164,14 +259,16 @@ def summary(df, category=None):
     print(f"Total rows:  {len(df)}\n")
 
     print("Choices by provider:")
-    chosen = df[df["chosen"]].groupby("provider")["product_id"].count()
+    # observed=True: provider/experiment_id are categoricals — only report
+    # combinations that actually occur, as before the dtype change
+    chosen = df[df["chosen"]].groupby("provider", observed=True)["product_id"].count()
     print(chosen.to_string(), "\n")
 
     print("Consideration set size by provider (mean):")
     considered = df[df["in_consideration"]].groupby(
-        ["experiment_id", "provider"]
+        ["experiment_id", "provider"], observed=True
     ).size().reset_index(name="set_size")
-    print(considered.groupby("provider")["set_size"].mean().round(1).to_string())
+    print(considered.groupby("provider", observed=True)["set_size"].mean().round(1).to_string())
 
 
 def describe(df, category=None):
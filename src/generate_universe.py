@@ -13,17 +13,41 @@ Output files: data/experiments/running_shoes/running_shoes_001.json, ...002.json
 
 Re-running is safe — existing files are skipped, so you can increase --n to
 add more offer sets without regenerating completed ones.
+
+Offer sets are independent, so generation parallelizes cleanly:
+    python src/generate_universe.py --category "Running Shoes" --n 500 --workers 4
 """
 
 import argparse
-import json
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
 sys.path.insert(0, ".")
+from src import jsonio
 from src.generator import ExperimentGenerator
 
 
+# Per-worker generator, created by _init_worker. Loading the seed in each
+# worker via the initializer beats pickling ~3MB of catalog per task.
+_worker_gen = None
+
+
+def _init_worker(seed_path):
+    global _worker_gen
+    _worker_gen = ExperimentGenerator(seed_path=seed_path)
+
+
+def _generate_one(task):
+    output_path, category, batch_size, position_mode = task
+    batch = _worker_gen.create_batch(size=batch_size, category=category)
+    batch = _worker_gen.mutate(batch)
+    batch = _worker_gen.assign_positions(batch, mode=position_mode)
+    batch = _worker_gen.inject_tags(batch)
+    with open(output_path, "wb") as f:
+        f.write(jsonio.dumps_bytes(batch, indent=True))
+
+
 def generate_universe(
     category,
     n=500,
@@ -31,6 +55,7 @@ def generate_universe(
     position_mode="random",
     experiments_dir="data/offer_sets",
     seed_path="data/seed_catalog.json",
+    workers=1,
 ):
     gen = ExperimentGenerator(seed_path=seed_path)
 
@@ -48,28 +73,35 @@ def generate_universe(
     output_dir = os.path.join(experiments_dir, slug)
     os.makedirs(output_dir, exist_ok=True)
 
-    created = 0
+    tasks = []
     skipped = 0
-
     for i in range(1, n + 1):
-        filename = f"{slug}_{i:03d}.json"
-        output_path = os.path.join(output_dir, filename)
-
+        output_path = os.path.join(output_dir, f"{slug}_{i:03d}.json")
         if os.path.exists(output_path):
             skipped += 1
-            continue
-
-        batch = gen.create_batch(size=batch_size, category=category)
-        batch = gen.mutate(batch)
-        batch = gen.assign_positions(batch, mode=position_mode)
-        batch = gen.inject_tags(batch)
+        else:
+            tasks.append((output_path, category, batch_size, position_mode))
 
-        with open(output_path, "w") as f:
-            json.dump(batch, f, indent=2)
+    created = 0
 
-        created += 1
-        if created % 50 == 0:
-            print(f"  Created {created} new offer sets...")
+    if workers <= 1:
+        global _worker_gen
+        _worker_gen = gen  # reuse the generator already loaded for validation
+        for task in tasks:
+            _generate_one(task)
+            created += 1
+            if created % 50 == 0:
+                print(f"  Created {created} new offer sets...")
+    else:
+        # Each offer set is an independent create/mutate/assign/inject/write —
+        # ProcessPoolExecutor sidesteps the GIL on the copy/sort-heavy work.
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(seed_path,)
+        ) as pool:
+            for _ in pool.map(_generate_one, tasks, chunksize=8):
+                created += 1
+                if created % 50 == 0:
+                    print(f"  Created {created} new offer sets...")
 
     print(f"\nDone. Created: {created}, Skipped (already existed): {skipped}")
     print(f"Offer sets in: {output_dir}")
@@ -86,6 +118,8 @@ if __name__ == "__main__":
     )
     parser.add_argument("--experiments-dir", default="data/offer_sets")
     parser.add_argument("--seed", default="data/seed_catalog.json")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for parallel generation (default: 1)")
 
     args = parser.parse_args()
     generate_universe(
@@ -95,4 +129,5 @@ if __name__ == "__main__":
         position_mode=args.position_mode,
         experiments_dir=args.experiments_dir,
         seed_path=args.seed,
+        workers=args.workers,
     )
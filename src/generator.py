@@ -1,46 +1,110 @@
-import copy
-import json
+import mmap
+import os
+import pickle
 import random
+import sys
+
+sys.path.insert(0, ".")
+from src import jsonio
 
 
 POSITION_MODES = ["random", "price_asc", "price_desc", "rating_desc"]
 
 
+def _clone(product):
+    """Copy of a product dict, two levels deep.
+
+    Products are plain JSON data — scalars, lists of strings, and a list of
+    flat review dicts — so a hand-rolled copy is enough and avoids
+    copy.deepcopy's memo bookkeeping and recursive type dispatch, which
+    dominate the batch-mutation pipeline for larger universes.
+    """
+    new = dict(product)
+    for key, value in new.items():
+        if type(value) is list:
+            new[key] = [{**v} if type(v) is dict else v for v in value]
+    return new
+
+
 class ExperimentGenerator:
-    def __init__(self, seed_path="data/seed_catalog.json", output_dir="data/experiments"):
+    def __init__(self, seed_path="data/seed_catalog.json", output_dir="data/experiments", seed=None):
         self.seed_path = seed_path
         self.output_dir = output_dir
         self.seed_data = []
+        self._by_category = {}
+        # Instance RNG: sampling/shuffling skips the global random lock, and
+        # passing a seed makes a generator's output reproducible.
+        self._rng = random.Random(seed)
         self._load_seed()
 
     def _load_seed(self):
-        """Loads the seed catalog from disk."""
+        """Loads the seed catalog from disk and indexes it by category.
+
+        A pickle side-car (<seed_path>.pkl) caches the parsed catalog:
+        pickle.load rebuilds this object graph several times faster than a
+        JSON parse, so every construction after the first (script runs,
+        worker processes) skips the parse. The side-car is rewritten
+        whenever the JSON file is newer, so editing the catalog just works.
+        """
+        pkl_path = f"{self.seed_path}.pkl"
         try:
-            with open(self.seed_path, 'r') as f:
-                self.seed_data = json.load(f)
-            print(f"Loaded {len(self.seed_data)} products from {self.seed_path}")
-        except FileNotFoundError:
-            print(f"Error: Seed file not found at {self.seed_path}")
+            if os.path.getmtime(pkl_path) >= os.path.getmtime(self.seed_path):
+                with open(pkl_path, "rb") as f:
+                    self.seed_data = pickle.load(f)
+        except Exception:
+            # A torn or garbage side-car raises all sorts of exception types
+            # (ValueError, AttributeError, ...) — it's a disposable cache, so
+            # any failure just falls back to the JSON below.
             self.seed_data = []
 
+        if not self.seed_data:
+            try:
+                # mmap + memoryview parses straight out of the page cache —
+                # no f.read() copy of the whole file before parsing
+                with open(self.seed_path, 'rb') as f:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        view = memoryview(mm)
+                        try:
+                            self.seed_data = jsonio.loads(view)
+                        finally:
+                            view.release()
+            except FileNotFoundError:
+                print(f"Error: Seed file not found at {self.seed_path}")
+                self.seed_data = []
+            else:
+                try:
+                    # Write-then-rename so a Ctrl-C or concurrent run can
+                    # never leave a half-written side-car with a fresh mtime
+                    tmp_path = f"{pkl_path}.{os.getpid()}.tmp"
+                    with open(tmp_path, "wb") as f:
+                        pickle.dump(self.seed_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    os.replace(tmp_path, pkl_path)
+                except OSError:
+                    pass  # read-only data dir — cache is an optimization only
+
+        if self.seed_data:
+            print(f"Loaded {len(self.seed_data)} products from {self.seed_path}")
+
+        # One pass up front — create_batch then samples straight from the
+        # per-category pool instead of re-filtering the whole seed per call
+        for p in self.seed_data:
+            self._by_category.setdefault(p.get("category"), []).append(p)
+
     def create_batch(self, size=25, category=None):
         """Randomly samples 'size' products from the seed, optionally filtered by category."""
         if not self.seed_data:
             print("No seed data available.")
             return []
 
-        pool = self.seed_data
-        if category:
-            pool = [p for p in self.seed_data if p.get("category") == category]
-            if not pool:
-                print(f"No products found for category: {category}")
-                return []
-            # pool size printed once by caller if needed
+        pool = self._by_category.get(category) if category else self.seed_data
+        if not pool:
+            print(f"No products found for category: {category}")
+            return []
 
         if size <= len(pool):
-            return random.sample(pool, size)
+            return self._rng.sample(pool, size)
         else:
-            return random.choices(pool, k=size)
+            return self._rng.choices(pool, k=size)
 
     def mutate(self, batch, price_multiplier=1.0, target_mutations=None):
         """
@@ -58,7 +122,7 @@ class ExperimentGenerator:
         """
         mutated_batch = []
         for item in batch:
-            new_item = copy.deepcopy(item)
+            new_item = _clone(item)
             if "base_price" in new_item:
                 price = new_item.pop("base_price")
                 new_item["price"] = round(price * price_multiplier, 2)
@@ -100,16 +164,21 @@ class ExperimentGenerator:
         if mode not in POSITION_MODES:
             raise ValueError(f"mode must be one of {POSITION_MODES}, got '{mode}'")
 
-        ordered = [copy.deepcopy(p) for p in batch]
+        ordered = [_clone(p) for p in batch]
 
+        # Keys are precomputed into a parallel list and looked up with the
+        # C-level __getitem__, instead of running a Python lambda (two dict
+        # gets + truthiness) per element inside the sort.
         if mode == "random":
-            random.shuffle(ordered)
-        elif mode == "price_asc":
-            ordered.sort(key=lambda p: p.get("price") or p.get("base_price") or 0)
-        elif mode == "price_desc":
-            ordered.sort(key=lambda p: p.get("price") or p.get("base_price") or 0, reverse=True)
+            self._rng.shuffle(ordered)
+        elif mode in ("price_asc", "price_desc"):
+            prices = [p.get("price") or p.get("base_price") or 0 for p in ordered]
+            idx = sorted(range(len(ordered)), key=prices.__getitem__, reverse=(mode == "price_desc"))
+            ordered = [ordered[i] for i in idx]
         elif mode == "rating_desc":
-            ordered.sort(key=lambda p: p.get("rating") or 0, reverse=True)
+            ratings = [p.get("rating") or 0 for p in ordered]
+            idx = sorted(range(len(ordered)), key=ratings.__getitem__, reverse=True)
+            ordered = [ordered[i] for i in idx]
 
         for i, product in enumerate(ordered):
             product["position"] = i + 1
@@ -150,20 +219,28 @@ class ExperimentGenerator:
         Returns:
             New list with "tags" fields populated.
         """
-        import copy
-        batch = [copy.deepcopy(p) for p in batch]
+        batch = [_clone(p) for p in batch]
 
         # Clear any pre-existing commercial tags so inject is idempotent
         commercial = {"Sponsored", "Best Seller", "Overall Pick"}
         for p in batch:
             p["tags"] = [t for t in (p.get("tags") or []) if t not in commercial]
 
+        # Tag membership via per-item sets — appends update the set alongside
+        # the list, so no linear scans of the tags lists
+        tags_sets = [set(p["tags"]) for p in batch]
+
         def _assign(tag, n_range):
-            n = random.randint(*n_range)
+            n = self._rng.randint(*n_range)
             n = min(n, len(batch))
-            for p in random.sample(batch, n):
-                if tag not in p["tags"]:
-                    p["tags"].append(tag)
+            # Shuffle an index list and take the prefix: picks n distinct
+            # items without materializing a sampled copy of the batch
+            idxs = list(range(len(batch)))
+            self._rng.shuffle(idxs)
+            for i in idxs[:n]:
+                if tag not in tags_sets[i]:
+                    batch[i]["tags"].append(tag)
+                    tags_sets[i].add(tag)
 
         _assign("Sponsored", n_sponsored)
         _assign("Best Seller", n_best_seller)
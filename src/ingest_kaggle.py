@@ -13,13 +13,19 @@ Usage:
 """
 
 import argparse
-import json
+import heapq
 import re
+import sys
 from collections import defaultdict
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
 
 from datasets import load_dataset
 
+sys.path.insert(0, ".")
+from src import jsonio
+
 HF_BASE = "hf://datasets/McAuley-Lab/Amazon-Reviews-2023"
 
 
@@ -76,10 +82,25 @@ CATEGORY_CONFIGS = {
 }
 
 
+_PRICE_CHARS = frozenset("0123456789.")
+
+
 def parse_price(price_str):
+    """Parse a price field to a positive float, or None.
+
+    Called once per scanned row, so the common case (already-numeric value
+    or clean numeric string) goes straight through float() without entering
+    the regex engine; only dirty strings like \"$19.99\" pay for the
+    character filter.
+    """
     if not price_str or price_str == "None":
         return None
-    cleaned = re.sub(r"[^\d.]", "", str(price_str))
+    try:
+        value = float(price_str)
+        return value if value > 0 else None
+    except (TypeError, ValueError):
+        pass
+    cleaned = "".join(c for c in str(price_str) if c in _PRICE_CHARS)
     if not cleaned:
         return None
     try:
@@ -89,35 +110,99 @@ def parse_price(price_str):
         return None
 
 
-def matches_keywords(item, keywords):
-    title = (item.get("title") or "").lower()
+def _compile_keywords(keywords):
+    """Compile a category's keywords into one alternation pattern.
+
+    A single regex scan of the haystack replaces N Python-level substring
+    searches (each of which also re-lowercased the keyword). Longest
+    alternatives first, so e.g. "running shoes" wins over "running shoe".
+    """
+    parts = sorted((re.escape(kw) for kw in keywords), key=len, reverse=True)
+    return re.compile("|".join(parts), re.IGNORECASE)
+
+
+def _haystack(item, title):
+    """Search text for keyword matching: title plus flattened category path.
+
+    Fields are joined with a newline — no keyword contains one — so a
+    multi-word keyword can never match across the title/category boundary
+    (e.g. title "... Wireless" + category "Headphone ..." must not match
+    "wireless headphone"). This mirrors the original per-field checks.
+    """
     categories = item.get("categories") or []
-    cat_text = " ".join(str(c) for c in categories).lower() if isinstance(categories, list) else str(categories).lower()
-    return any(kw.lower() in title or kw.lower() in cat_text for kw in keywords)
+    cat_text = " ".join(str(c) for c in categories) if isinstance(categories, list) else str(categories)
+    return f"{title}\n{cat_text}" if cat_text else title
 
 
-def _stream_jsonl(path):
-    """Stream a HuggingFace JSONL file line-by-line, yielding dicts.
+def _stream_jsonl(path, chunk_size=4 * 1024 * 1024):
+    """Stream a HuggingFace JSONL file, yielding dicts.
+
+    Reads fixed-size binary chunks and splits them into lines, carrying the
+    trailing partial line across reads — per-row Python overhead (text-mode
+    decode, line iteration bookkeeping) is amortized over megabytes instead
+    of paid per line, which matters on the multi-million-row review files.
 
     Using fsspec directly avoids datasets' schema inference, which fails when
     a column changes type mid-file (e.g. price as int then string).
     """
     import fsspec
-    with fsspec.open(path, "rt", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                yield json.loads(line)
-            except json.JSONDecodeError:
-                continue
+    tail = b""
+    with fsspec.open(path, "rb") as f:
+        while True:
+            buf = f.read(chunk_size)
+            if not buf:
+                break
+            lines = (tail + buf).split(b"\n")
+            tail = lines.pop()  # partial line, completed by the next chunk
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    yield jsonio.loads(line)
+                except ValueError:
+                    continue
+    if tail.strip():
+        try:
+            yield jsonio.loads(tail)
+        except ValueError:
+            pass
+
+
+# The only parquet columns Phases 1/3 consume — projecting to these lets the
+# reader skip IO and decode for the many columns we never look at
+_META_COLUMNS = [
+    "title", "price", "parent_asin", "categories",
+    "average_rating", "rating_number", "description", "features", "store",
+]
+
+
+def _stream_parquet(path):
+    """Stream a parquet source as row dicts via pyarrow.dataset.
+
+    Column projection plus 64k-row batches: only the nine columns we use are
+    read, and per-row Python overhead is amortized across each batch instead
+    of paid through the datasets streaming wrapper.
+    """
+    import fsspec
+    import pyarrow.dataset as ds
+
+    fs, _, paths = fsspec.get_fs_token_paths(path)
+    scanner = ds.dataset(paths, format="parquet", filesystem=fs).scanner(
+        columns=_META_COLUMNS, batch_size=65536
+    )
+    for batch in scanner.to_batches():
+        yield from batch.to_pylist()
 
 
 def _open_stream(source):
     fmt, path = source["fmt"], source["path"]
     if fmt == "parquet":
-        return load_dataset("parquet", data_files={"full": path}, split="full", streaming=True)
+        try:
+            import pyarrow.dataset  # noqa: F401 — probe before returning the generator
+        except ImportError:
+            # Fallback: datasets streaming reads all columns, but works everywhere
+            return load_dataset("parquet", data_files={"full": path}, split="full", streaming=True)
+        return _stream_parquet(path)
     return _stream_jsonl(path)
 
 
@@ -135,6 +220,17 @@ def stream_metadata_multi(source, category_configs, category_limits):
     ds = _open_stream(source)
 
     results = {cat: {} for cat in category_configs}
+
+    # One merged pattern across every category sharing this source file: a
+    # single scan of the haystack finds all keyword hits, and each hit maps
+    # back to its owning categories. For the Electronics file — four
+    # categories today — this replaces four separate scans per row.
+    kw_to_cats = defaultdict(list)
+    for cat, cfg in category_configs.items():
+        for kw in cfg["keywords"]:
+            kw_to_cats[kw.lower()].append(cat)
+    merged_pattern = _compile_keywords(kw_to_cats.keys())
+
     full_categories = set()
     scanned = 0
 
@@ -144,22 +240,38 @@ def stream_metadata_multi(source, category_configs, category_limits):
             counts = ", ".join(f"{cat}: {len(results[cat])}" for cat in cats)
             print(f"    Scanned {scanned:,} | {counts}")
 
+        # Filters ordered cheapest-reject first: dict lookups, then keyword
+        # match, then price parsing. Keyword selectivity is well under 1%,
+        # so deferring parse_price until a category matches skips it for
+        # nearly every row.
         title = item.get("title")
         if not title or not title.strip():
             continue
-        if parse_price(item.get("price")) is None:
-            continue
         parent_asin = item.get("parent_asin")
         if not parent_asin:
             continue
 
-        for cat, cfg in category_configs.items():
+        # Built once per item — categories sharing a source file each match
+        # against the same text, so don't rebuild it per category
+        haystack = _haystack(item, title)
+
+        hit_cats = {
+            cat
+            for m in merged_pattern.finditer(haystack)
+            for cat in kw_to_cats[m.group(0).lower()]
+        }
+        if not hit_cats:
+            continue
+
+        if parse_price(item.get("price")) is None:
+            continue
+
+        for cat in hit_cats:
             if cat in full_categories or parent_asin in results[cat]:
                 continue
-            if matches_keywords(item, cfg["keywords"]):
-                results[cat][parent_asin] = item
-                if len(results[cat]) >= category_limits[cat]:
-                    full_categories.add(cat)
+            results[cat][parent_asin] = item
+            if len(results[cat]) >= category_limits[cat]:
+                full_categories.add(cat)
 
         if len(full_categories) >= len(category_configs):
             break
@@ -203,7 +315,11 @@ def fetch_reviews_multi(source, asin_set, per_product, max_scan=5_000_000):
         if asin not in asin_set or asin in satisfied:
             continue
 
-        candidates[asin].append(item)
+        # Rank key ((verified, helpful_vote)) computed once at insertion, so
+        # the top-K selection below never reaches back into the dicts
+        candidates[asin].append(
+            ((1 if item.get("verified_purchase") else 0, item.get("helpful_vote") or 0), item)
+        )
         if len(candidates[asin]) >= per_product:
             satisfied.add(asin)
 
@@ -214,19 +330,20 @@ def fetch_reviews_multi(source, asin_set, per_product, max_scan=5_000_000):
             print(f"    Hit max_scan limit ({max_scan:,}). Stopping with {len(satisfied)}/{len(asin_set)} fully satisfied.")
             break
 
+    # Top-K selection, not a full sort — O(n log k) and no sorted copy.
+    # (A bounded heap maintained during the scan would give better top-K
+    # quality, but it requires scanning past per_product reviews per ASIN,
+    # which would defeat the early-stop above.)
     reviews = {}
     for asin, revs in candidates.items():
-        revs.sort(
-            key=lambda r: (1 if r.get("verified_purchase") else 0, r.get("helpful_vote") or 0),
-            reverse=True,
-        )
-        reviews[asin] = revs[:per_product]
+        top = heapq.nlargest(per_product, revs, key=itemgetter(0))
+        reviews[asin] = [item for _, item in top]
 
     print(f"    Done. Scanned {scanned:,} reviews, got reviews for {len(reviews)} products.")
     return reviews
 
 
-def transform_product(meta, reviews, category, idx):
+def transform_product(meta, reviews, category, cat_slug, idx):
     desc_raw = meta.get("description") or []
     description = "\n".join(str(s) for s in desc_raw if s).strip() if isinstance(desc_raw, list) else str(desc_raw).strip()
 
@@ -234,7 +351,6 @@ def transform_product(meta, reviews, category, idx):
     features = [str(f).strip() for f in features_raw if f and str(f).strip()] if isinstance(features_raw, list) else []
 
     rating = meta.get("average_rating") or 0.0
-    cat_slug = category.lower().replace(" ", "_")
 
     return {
         "id": f"prod_{cat_slug}_{idx:03d}",
@@ -299,7 +415,8 @@ def main():
         batch = stream_metadata_multi(src, active_cats, limits)
         for cat, products in batch.items():
             remaining = args.products_per_category - len(all_products[cat])
-            for asin, item in list(products.items())[:remaining]:
+            # islice takes the prefix lazily — no full list copy of the items
+            for asin, item in islice(products.items(), remaining):
                 all_products[cat][asin] = item
 
     # ── Phase 2: Reviews — one pass per unique source file ───────────────────
@@ -322,6 +439,8 @@ def main():
     all_reviews = {}  # asin → [reviews]
 
     for src_path, src in review_sources_by_path.items():
+        if not review_asins_by_path[src_path]:
+            continue
         needed = review_asins_by_path[src_path] - all_reviews.keys()
         if not needed:
             continue
@@ -336,17 +455,18 @@ def main():
     full_catalog = []
     for cat in args.categories:
         count_before = len(full_catalog)
+        cat_slug = cat.lower().replace(" ", "_")  # per category, not per product
         for idx, (asin, meta) in enumerate(all_products[cat].items(), start=1):
             reviews = all_reviews.get(asin, [])
             if not reviews:
                 continue
-            full_catalog.append(transform_product(meta, reviews, cat, idx))
+            full_catalog.append(transform_product(meta, reviews, cat, cat_slug, idx))
         print(f"  {cat}: {len(full_catalog) - count_before} products")
 
     output_path = Path(args.output)
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, "w") as f:
-        json.dump(full_catalog, f, indent=2)
+    with open(output_path, "wb") as f:
+        f.write(jsonio.dumps_bytes(full_catalog, indent=True))
 
     print(f"\n{'=' * 60}")
     print(f"Done! Wrote {len(full_catalog)} products to {output_path}")
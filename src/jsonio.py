@@ -0,0 +1,41 @@
+"""
+JSON encode/decode helpers backed by orjson when it is installed.
+
+orjson parses and serializes several times faster than the stdlib module,
+which matters in the hot paths here: loading hundreds of result/batch files
+in analysis, and serializing full product feeds into prompts. The stdlib
+fallback keeps every script runnable without the optional dependency.
+
+Usage:
+    from src import jsonio
+    data = jsonio.loads(raw)              # accepts str or bytes
+    text = jsonio.dumps(obj, indent=True) # str, for embedding in prompts
+    blob = jsonio.dumps_bytes(obj)        # bytes, for binary file writes
+"""
+
+try:
+    import orjson
+
+    def loads(data):
+        return orjson.loads(data)
+
+    def dumps(obj, indent=False):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+
+    def dumps_bytes(obj, indent=False):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+
+except ImportError:
+    import json
+
+    def loads(data):
+        # orjson takes any bytes-like object; stdlib json does not
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+    def dumps(obj, indent=False):
+        return json.dumps(obj, indent=2 if indent else None)
+
+    def dumps_bytes(obj, indent=False):
+        return dumps(obj, indent=indent).encode()
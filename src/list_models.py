@@ -0,0 +1,49 @@
+"""
+Lists the Gemini models available to the configured API key.
+
+Handy for checking which model IDs the current key can actually call
+before wiring one into providers.py.
+
+Usage:
+    python src/list_models.py
+
+Nothing runs at import time — the client is only created inside main(), and
+the model list is cached for a day (per API key) so repeat calls don't pay
+the network round-trip.
+"""
+
+import hashlib
+import os
+import time
+from pathlib import Path
+
+CACHE_TTL = 86400  # one day, in seconds
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        print("Error: GEMINI_API_KEY not set in environment")
+        return
+
+    # Cache per key — hashed, so the key itself never lands on disk
+    key_hash = hashlib.sha256(api_key.encode()).hexdigest()[:16]
+    cache_path = Path(f"~/.cache/shopper/models_{key_hash}.txt").expanduser()
+    if cache_path.exists() and time.time() - cache_path.stat().st_mtime < CACHE_TTL:
+        print(cache_path.read_text(), end="")
+        return
+
+    from google import genai
+    client = genai.Client(api_key=api_key)
+    names = "".join(f"{model.name}\n" for model in client.models.list())
+    print(names, end="")
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    cache_path.write_text(names)
+
+
+if __name__ == "__main__":
+    main()
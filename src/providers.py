@@ -1,8 +1,10 @@
 """
 LLM provider registry for the Shopper experiment engine.
 
-Each provider is a simple function that takes a prompt string and returns
-a response string. The PROVIDERS dict maps short provider keys to a tuple of:
+Each provider is a simple function that takes a prompt string (plus an
+optional static system block, passed in a provider-cacheable form) and
+returns a response string. The PROVIDERS dict maps short provider keys to
+a tuple of:
     (call_fn, display_name, model_id)
 
 model_id is stored in result metadata so the DataFrame can filter by model.
@@ -15,95 +17,155 @@ Free-tier limits (as of Mar 2026):
 """
 
 import os
+from functools import lru_cache
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# SDKs are optional dependencies — you only need the ones for the providers
+# you run. Importing once at module load (instead of inside each call) keeps
+# the import machinery and its lock out of the per-call path, and surfaces a
+# missing package on the first call with a clear install hint.
+try:
+    from openai import OpenAI
+except ImportError:
+    OpenAI = None
+
+try:
+    from anthropic import Anthropic
+except ImportError:
+    Anthropic = None
 
-def call_gemini(prompt, model="gemini-2.5-flash"):
+try:
     from google import genai
-    from google.genai import types
+    from google.genai import types as genai_types
+except ImportError:
+    genai = None
+    genai_types = None
+
+
+# Clients are cached per (api_key, base_url): SDK clients own an HTTP
+# connection pool, so reusing one across calls keeps TLS sessions alive
+# instead of paying connect + handshake on every request.
+
+@lru_cache(maxsize=None)
+def _openai_client(api_key, base_url=None):
+    if OpenAI is None:
+        raise RuntimeError("openai package not installed — pip install openai")
+    return OpenAI(api_key=api_key, base_url=base_url)
+
+
+@lru_cache(maxsize=None)
+def _anthropic_client(api_key):
+    if Anthropic is None:
+        raise RuntimeError("anthropic package not installed — pip install anthropic")
+    return Anthropic(api_key=api_key)
+
+
+@lru_cache(maxsize=None)
+def _gemini_client(api_key):
+    if genai is None:
+        raise RuntimeError("google-genai package not installed — pip install google-genai")
+    return genai.Client(api_key=api_key)
+
+
+def _chat_messages(prompt, system):
+    """OpenAI-style message list, with the static system block first.
 
+    Keeping the invariant instruction block at the start of the message list
+    lets OpenAI/DeepSeek/Groq automatic prefix caching kick in across calls
+    that share it — only the per-offer-set feed differs between requests.
+    """
+    messages = []
+    if system:
+        messages.append({"role": "system", "content": system})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+def call_gemini(prompt, model="gemini-2.5-flash", system=None):
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
         raise ValueError("GEMINI_API_KEY not set in environment")
 
-    client = genai.Client(api_key=api_key)
+    client = _gemini_client(api_key)
     response = client.models.generate_content(
         model=model,
         contents=prompt,
-        config=types.GenerateContentConfig(response_mime_type="application/json"),
+        config=genai_types.GenerateContentConfig(
+            response_mime_type="application/json",
+            system_instruction=system,
+        ),
     )
     return response.text
 
 
-def call_openai(prompt):
-    from openai import OpenAI
-
+def call_openai(prompt, system=None):
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise ValueError("OPENAI_API_KEY not set in environment")
 
-    client = OpenAI(api_key=api_key)
+    client = _openai_client(api_key)
     response = client.chat.completions.create(
         model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
+        messages=_chat_messages(prompt, system),
         response_format={"type": "json_object"},
     )
     return response.choices[0].message.content
 
 
-def call_claude(prompt):
-    from anthropic import Anthropic
-
+def call_claude(prompt, system=None):
     api_key = os.getenv("ANTHROPIC_API_KEY")
     if not api_key:
         raise ValueError("ANTHROPIC_API_KEY not set in environment")
 
-    client = Anthropic(api_key=api_key)
+    client = _anthropic_client(api_key)
+    kwargs = {}
+    if system:
+        # cache_control marks the static block for Anthropic prompt caching:
+        # repeat calls reuse the cached prefix at a fraction of the token rate.
+        kwargs["system"] = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
     response = client.messages.create(
         model="claude-sonnet-4-20250514",
         max_tokens=4096,
         messages=[{"role": "user", "content": prompt}],
+        **kwargs,
     )
     return response.content[0].text
 
 
-def call_deepseek(prompt):
-    from openai import OpenAI
-
+def call_deepseek(prompt, system=None):
     api_key = os.getenv("DEEPSEEK_API_KEY")
     if not api_key:
         raise ValueError("DEEPSEEK_API_KEY not set in environment")
 
-    client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
+    client = _openai_client(api_key, base_url="https://api.deepseek.com")
     response = client.chat.completions.create(
         model="deepseek-chat",
-        messages=[{"role": "user", "content": prompt}],
+        messages=_chat_messages(prompt, system),
         response_format={"type": "json_object"},
     )
     return response.choices[0].message.content
 
 
-def call_groq(prompt, model="llama-3.3-70b-versatile"):
-    from openai import OpenAI
-
+def call_groq(prompt, model="llama-3.3-70b-versatile", system=None):
     api_key = os.getenv("GROQ_API_KEY")
     if not api_key:
         raise ValueError("GROQ_API_KEY not set in environment")
 
-    client = OpenAI(api_key=api_key, base_url="https://api.groq.com/openai/v1")
+    client = _openai_client(api_key, base_url="https://api.groq.com/openai/v1")
     response = client.chat.completions.create(
         model=model,
-        messages=[{"role": "user", "content": prompt}],
+        messages=_chat_messages(prompt, system),
         response_format={"type": "json_object"},
     )
     return response.choices[0].message.content
 
 
 PROVIDERS = {
-    "gemini":       (lambda p: call_gemini(p, "gemini-2.5-flash"), "Gemini 2.5 Flash",      "gemini-2.5-flash"),
-    "gemini-flash": (lambda p: call_gemini(p, "gemini-2.0-flash"), "Gemini 2.0 Flash",      "gemini-2.0-flash"),
+    "gemini":       (lambda p, system=None: call_gemini(p, "gemini-2.5-flash", system=system), "Gemini 2.5 Flash", "gemini-2.5-flash"),
+    "gemini-flash": (lambda p, system=None: call_gemini(p, "gemini-2.0-flash", system=system), "Gemini 2.0 Flash", "gemini-2.0-flash"),
     "groq":         (call_groq,     "Groq Llama 3.3 70B", "llama-3.3-70b-versatile"),
     "openai":       (call_openai,   "ChatGPT",             "gpt-4o-mini"),
     "claude":       (call_claude,   "Claude",              "claude-sonnet-4-20250514"),
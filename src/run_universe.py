@@ -16,6 +16,9 @@ Usage:
     # Test a subset before committing to a full run
     python src/run_universe.py --category-dir data/offer_sets/running_shoes --model groq --limit 10
 
+    # Paid-tier providers: run several offer sets concurrently
+    python src/run_universe.py --category-dir data/offer_sets/running_shoes --model openai --workers 4
+
 Prompt variants (ablation study):
     full        ~10k tokens  description (300 chars) + reviews (200 chars each)  [default]
     no_reviews  ~ 5k tokens  full description, no reviews
@@ -29,13 +32,15 @@ separate from the primary dataset.
 """
 
 import argparse
-import json
+import hashlib
 import re
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 sys.path.insert(0, ".")
+from src import jsonio
 from src.providers import PROVIDERS
 from dotenv import load_dotenv
 
@@ -43,18 +48,90 @@ load_dotenv()
 
 VARIANTS = ["full", "no_reviews", "minimal", "extended"]
 
+CACHE_DIR = Path("data/cache")
+
+# Prompt templates, built once at import. The doubled braces are literal
+# JSON braces in the required response format.
+_SYSTEM_TMPL = """You are a shopping assistant. Review the JSON product feed the customer provides and select a consideration set of {k} products that best meet the customer's needs.
+
+You may also choose "no_purchase" as your final choice if none of the products are suitable.
+
+You MUST respond with ONLY valid JSON in this exact format, no other text:
+{{
+  "experiment_id": "exp_placeholder",
+  "decision": {{
+    "consideration_set": ["prod_id_1", "prod_id_2"],
+    "final_choice": "prod_id_1",
+    "reasoning_trace": "Your reasoning here..."
+  }}
+}}"""
+
+_USER_TMPL = """A customer is looking to buy {category}.
+
+Product Feed:
+{feed}"""
+
+# Batched mode (--batch-k): several offer sets share one request, amortizing
+# the instruction block and HTTP round-trip across them.
+_BATCH_SYSTEM_TMPL = """You are a shopping assistant. The customer provides several independent product feeds, each labelled with its offer_set_id. For EACH feed, select a consideration set of {k} products that best meet the customer's needs.
+
+You may also choose "no_purchase" as a feed's final choice if none of its products are suitable.
+
+Treat the feeds as fully independent — never compare products or carry reasoning across feeds.
+
+You MUST respond with ONLY valid JSON in this exact format, no other text, with exactly one entry per feed in the same order as given:
+{{
+  "results": [
+    {{
+      "offer_set_id": "the offer_set_id of the feed",
+      "experiment_id": "exp_placeholder",
+      "decision": {{
+        "consideration_set": ["prod_id_1", "prod_id_2"],
+        "final_choice": "prod_id_1",
+        "reasoning_trace": "Your reasoning here..."
+      }}
+    }}
+  ]
+}}"""
+
+_BATCH_USER_TMPL = """A customer is looking to buy {category}.
+
+{feeds}"""
 
-def call_provider(prompt, provider_name, max_retries=3):
-    """Calls a provider with retry logic for transient rate limits."""
+
+def _cache_path(provider_name, model_id, system, prompt):
+    """Deterministic cache location for one (provider, model, prompt) call."""
+    key = hashlib.sha256(f"{provider_name}|{model_id}|{system or ''}|{prompt}".encode()).hexdigest()
+    return CACHE_DIR / f"{key}.json"
+
+
+def call_provider(prompt, provider_name, system=None, max_retries=3, use_cache=True):
+    """Calls a provider with retry logic for transient rate limits.
+
+    Responses are cached on disk keyed by (provider, model, prompt) so that
+    re-runs during development — e.g. after wiping a results dir or changing
+    downstream parsing — don't pay for identical API calls again. Pass
+    use_cache=False (--no-cache on the CLI) to force fresh calls.
+    """
     if provider_name not in PROVIDERS:
         print(f"Error: Unknown provider '{provider_name}'. Available: {list(PROVIDERS.keys())}")
         return None
 
-    call_fn, display_name, _ = PROVIDERS[provider_name]
+    call_fn, display_name, model_id = PROVIDERS[provider_name]
+
+    cache_file = _cache_path(provider_name, model_id, system, prompt)
+    if use_cache and cache_file.exists():
+        with open(cache_file, "rb") as f:
+            return jsonio.loads(f.read())["response"]
 
     for attempt in range(1, max_retries + 1):
         try:
-            return call_fn(prompt)
+            response = call_fn(prompt, system=system)
+            if use_cache and response is not None:
+                CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                with open(cache_file, "wb") as f:
+                    f.write(jsonio.dumps_bytes({"provider": provider_name, "model": model_id, "response": response}))
+            return response
         except Exception as e:
             err = str(e)
 
@@ -78,16 +155,18 @@ def call_provider(prompt, provider_name, max_retries=3):
     return None
 
 
+# Extracts the payload of a ```json ... ``` (or bare ```) fence in one scan
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+
 def parse_response(response_str):
     if not response_str:
         return None
+    match = _FENCE_RE.search(response_str)
+    payload = match.group(1).strip() if match else response_str
     try:
-        if "```json" in response_str:
-            response_str = response_str.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_str:
-            response_str = response_str.split("```")[1].split("```")[0].strip()
-        return json.loads(response_str)
-    except json.JSONDecodeError:
+        return jsonio.loads(payload)
+    except ValueError:
         print(f"  Failed to parse response: {response_str[:200]}")
         return None
 
@@ -129,28 +208,164 @@ def slim_product(p, variant="full"):
 
 
 def build_prompt(products, category, k, variant="full"):
-    category_line = f"A customer is looking to buy {category}."
+    """
+    Builds the (system, user) prompt pair for one offer set.
+
+    The instruction/format block is identical across every offer set in a
+    run, so it goes in the system block — providers cache that static prefix
+    server-side (Anthropic cache_control, OpenAI/Groq/DeepSeek automatic
+    prefix caching, Gemini system_instruction), leaving only the per-offer-set
+    feed as fresh input tokens.
+    """
     slimmed = [slim_product(p, variant=variant) for p in products]
-    products_json = json.dumps(slimmed, indent=2)
-    return f"""You are a shopping assistant. {category_line} Review the following JSON product feed and select a consideration set of {k} products that best meet the customer's needs.
+    system = _SYSTEM_TMPL.format(k=k)
+    # Compact JSON — the feed is machine-to-machine input, and indentation
+    # is ~20-30% extra whitespace tokens the model still has to ingest.
+    user = _USER_TMPL.format(category=category, feed=jsonio.dumps(slimmed))
+    return system, user
 
-You may also choose "no_purchase" as your final choice if none of the products are suitable.
 
-Product Feed:
-{products_json}
+def _write_result(result_path, result):
+    # Render once, write once — json.dump would issue one small f.write
+    # per token, which is pure syscall/buffer churn for indent output.
+    with open(result_path, "wb") as f:
+        f.write(jsonio.dumps_bytes(result, indent=True))
 
-You MUST respond with ONLY valid JSON in this exact format, no other text:
-{{
-  "experiment_id": "exp_placeholder",
-  "decision": {{
-    "consideration_set": ["prod_id_1", "prod_id_2"],
-    "final_choice": "prod_id_1",
-    "reasoning_trace": "Your reasoning here..."
-  }}
-}}"""
 
+class _ResultWriter:
+    """Single background thread for result writes, tracking failures.
+
+    Writes happen off the LLM call path, but their errors must not vanish
+    with them — a full disk would otherwise report every offer set as
+    "done" with zero files on disk. Failures are collected per write and
+    settled into the run totals after close().
+    """
+
+    def __init__(self):
+        self._pool = ThreadPoolExecutor(max_workers=1)
+        self.failures = []  # (result_path, exception)
 
-def run_universe(category_dir, model, k=5, results_dir=None, limit=None, variant="full"):
+    def submit(self, result_path, result):
+        future = self._pool.submit(_write_result, result_path, result)
+        future.add_done_callback(lambda f: self._record(result_path, f))
+
+    def _record(self, result_path, future):
+        exc = future.exception()
+        if exc is not None:
+            self.failures.append((result_path, exc))
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+
+def _infer_offer_set(offer_set_file, result_path, category, model, model_id, k, variant,
+                     use_cache=True, writer=None):
+    """
+    Runs a single offer set through the model and writes its result file.
+
+    Returns "done", "failed", or "quota". Safe to call from worker threads —
+    the work is one HTTP round-trip plus one independent file write. When a
+    _ResultWriter is given, the disk write is handed off to it so the
+    caller can start the next LLM call immediately.
+    """
+    with open(offer_set_file, "rb") as f:
+        products = jsonio.loads(f.read())
+
+    system, prompt = build_prompt(products, category, k, variant=variant)
+    response_str = call_provider(prompt, model, system=system, use_cache=use_cache)
+
+    if response_str == "QUOTA_EXHAUSTED":
+        return "quota"
+
+    result = parse_response(response_str)
+    if not result:
+        return "failed"
+
+    result["metadata"] = {
+        "source_batch": str(offer_set_file),
+        "offer_set_id": offer_set_file.stem,
+        "timestamp": int(time.time()),
+        "provider": model,
+        "model": model_id,
+        "variant": variant,
+        "k": k,
+    }
+    if writer is not None:
+        writer.submit(result_path, result)
+    else:
+        _write_result(result_path, result)
+    return "done"
+
+
+def _infer_offer_set_group(group, category, model, model_id, k, variant, use_cache, writer):
+    """
+    Runs several offer sets through the model in one request (batched mode).
+
+    group is a list of (offer_set_file, result_path) pairs. The model returns
+    one decision per feed; each is persisted as its own result file, so
+    downstream analysis is identical to single-call mode. Returns a list of
+    per-offer-set statuses ("done"/"failed"), or ["quota", ...] on quota.
+    """
+    feeds = []
+    for offer_set_file, _ in group:
+        with open(offer_set_file, "rb") as f:
+            products = jsonio.loads(f.read())
+        slimmed = [slim_product(p, variant=variant) for p in products]
+        feeds.append(f'Offer set "{offer_set_file.stem}":\n{jsonio.dumps(slimmed)}')
+
+    system = _BATCH_SYSTEM_TMPL.format(k=k)
+    user = _BATCH_USER_TMPL.format(category=category, feeds="\n\n".join(feeds))
+    response_str = call_provider(user, model, system=system, use_cache=use_cache)
+
+    if response_str == "QUOTA_EXHAUSTED":
+        return ["quota"] * len(group)
+
+    parsed = parse_response(response_str)
+    results = (parsed or {}).get("results")
+    if not isinstance(results, list) or len(results) != len(group):
+        got = len(results) if isinstance(results, list) else 0
+        print(f"  Batched response malformed: {got}/{len(group)} decisions — marking group failed.")
+        return ["failed"] * len(group)
+
+    # Match decisions by offer_set_id, falling back to position for models
+    # that echo the ids imperfectly
+    by_id = {r.get("offer_set_id"): r for r in results if isinstance(r, dict)}
+    timestamp = int(time.time())
+
+    statuses = []
+    for i, (offer_set_file, result_path) in enumerate(group):
+        stem = offer_set_file.stem
+        entry = by_id.get(stem) or (results[i] if isinstance(results[i], dict) else None)
+        decision = entry.get("decision") if entry else None
+        if not isinstance(decision, dict):
+            statuses.append("failed")
+            continue
+
+        result = {
+            "experiment_id": entry.get("experiment_id", "exp_placeholder"),
+            "decision": decision,
+            "metadata": {
+                "source_batch": str(offer_set_file),
+                "offer_set_id": stem,
+                "timestamp": timestamp,
+                "provider": model,
+                "model": model_id,
+                "variant": variant,
+                "k": k,
+                "batch_k": len(group),
+            },
+        }
+        if writer is not None:
+            writer.submit(result_path, result)
+        else:
+            _write_result(result_path, result)
+        statuses.append("done")
+
+    return statuses
+
+
+def run_universe(category_dir, model, k=5, results_dir=None, limit=None, variant="full", workers=1,
+                 use_cache=True, batch_k=1):
     category_dir = Path(category_dir)
     if not category_dir.exists():
         print(f"Error: Directory not found: {category_dir}")
@@ -163,8 +378,8 @@ def run_universe(category_dir, model, k=5, results_dir=None, limit=None, variant
 
     _, display_name, model_id = PROVIDERS[model]
 
-    with open(offer_set_files[0]) as f:
-        first_batch = json.load(f)
+    with open(offer_set_files[0], "rb") as f:
+        first_batch = jsonio.loads(f.read())
     category = first_batch[0].get("category", "Unknown") if first_batch else "Unknown"
 
     # Ablation results go to a separate directory to keep primary data clean
@@ -182,10 +397,7 @@ def run_universe(category_dir, model, k=5, results_dir=None, limit=None, variant
     print(f"Results in: {results_dir}\n")
 
     completed = 0
-    run = 0
-    failed = 0
-    consecutive_failures = 0
-    MAX_CONSECUTIVE_FAILURES = 5
+    pending = []  # (offer_set_file, result_path) still to run
 
     for offer_set_file in offer_set_files:
         stem = offer_set_file.stem
@@ -198,49 +410,116 @@ def run_universe(category_dir, model, k=5, results_dir=None, limit=None, variant
 
         if result_path.exists():
             completed += 1
-            continue
-
-        if limit is not None and run >= limit:
-            print(f"\nLimit of {limit} new inferences reached.")
-            return
-
-        with open(offer_set_file) as f:
-            products = json.load(f)
-
-        done_so_far = completed + run
-        print(f"[{done_so_far + 1}/{n_total}] {stem}...", end=" ", flush=True)
-
-        prompt = build_prompt(products, category, k, variant=variant)
-        response_str = call_provider(prompt, model)
+        else:
+            pending.append((offer_set_file, result_path))
 
-        if response_str == "QUOTA_EXHAUSTED":
-            print(f"\nStopped after {run} new inferences ({completed} already done).")
-            return
+    if limit is not None:
+        pending = pending[:limit]
 
-        result = parse_response(response_str)
+    run = 0
+    failed = 0
+    consecutive_failures = 0
+    MAX_CONSECUTIVE_FAILURES = 5
 
-        if result:
-            result["metadata"] = {
-                "source_batch": str(offer_set_file),
-                "offer_set_id": stem,
-                "timestamp": int(time.time()),
-                "provider": model,
-                "model": model_id,
-                "variant": variant,
-                "k": k,
-            }
-            with open(result_path, "w") as f:
-                json.dump(result, f, indent=2)
-            print("done")
-            run += 1
-            consecutive_failures = 0
+    # Single background writer: result files land on disk off the call path,
+    # so the next LLM request never waits on disk IO. close() in the finally
+    # block flushes pending writes on every exit path — keeping the
+    # file-existence resumability contract intact — and any write failures
+    # are surfaced and settled into the run totals there.
+    writer = _ResultWriter()
+    try:
+        if batch_k > 1:
+            # Batched mode: k offer sets per request amortizes the static
+            # instruction tokens and the HTTP round-trip. Sequential only —
+            # each request is already doing batch_k offer sets of work.
+            for start in range(0, len(pending), batch_k):
+                group = pending[start:start + batch_k]
+                names = ", ".join(f.stem for f, _ in group)
+                print(f"[{completed + run + failed + 1}/{n_total}] batch of {len(group)} ({names})...", flush=True)
+
+                statuses = _infer_offer_set_group(group, category, model, model_id, k, variant, use_cache, writer)
+
+                if "quota" in statuses:
+                    print(f"\nStopped after {run} new inferences ({completed} already done).")
+                    return
+                done_n = statuses.count("done")
+                run += done_n
+                failed += statuses.count("failed")
+                print(f"  {done_n}/{len(group)} done")
+                if done_n:
+                    consecutive_failures = 0
+                else:
+                    consecutive_failures += 1
+                    if consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+                        print(f"\nStopping: {consecutive_failures} consecutive failed batches — check model name or API key.")
+                        return
+        elif workers <= 1:
+            for offer_set_file, result_path in pending:
+                done_so_far = completed + run
+                print(f"[{done_so_far + 1}/{n_total}] {offer_set_file.stem}...", end=" ", flush=True)
+
+                status = _infer_offer_set(offer_set_file, result_path, category, model, model_id, k, variant,
+                                          use_cache, writer)
+
+                if status == "quota":
+                    print(f"\nStopped after {run} new inferences ({completed} already done).")
+                    return
+                elif status == "done":
+                    print("done")
+                    run += 1
+                    consecutive_failures = 0
+                else:
+                    print("failed")
+                    failed += 1
+                    consecutive_failures += 1
+                    if consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+                        print(f"\nStopping: {consecutive_failures} consecutive failures — check model name or API key.")
+                        return
         else:
-            print("failed")
-            failed += 1
-            consecutive_failures += 1
-            if consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
-                print(f"\nStopping: {consecutive_failures} consecutive failures — check model name or API key.")
-                return
+            # Concurrent mode: offer sets are independent, so overlap the HTTP
+            # round-trips. Only sensible on paid tiers — free-tier rate limits
+            # make parallel requests trip 429s immediately.
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(_infer_offer_set, f, rp, category, model, model_id, k, variant, use_cache, writer): f
+                    for f, rp in pending
+                }
+                for future in as_completed(futures):
+                    stem = futures[future].stem
+                    status = future.result()
+
+                    if status == "quota":
+                        print("\nDaily quota exhausted — cancelling remaining offer sets.")
+                        for other in futures:
+                            other.cancel()
+                        break
+                    elif status == "done":
+                        run += 1
+                        consecutive_failures = 0
+                        print(f"[{completed + run + failed}/{n_total}] {stem}... done")
+                    else:
+                        failed += 1
+                        consecutive_failures += 1
+                        print(f"[{completed + run + failed}/{n_total}] {stem}... failed")
+                        if consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+                            print(f"\nStopping: {consecutive_failures} consecutive failures — check model name or API key.")
+                            for other in futures:
+                                other.cancel()
+                            break
+    finally:
+        writer.close()
+        if writer.failures:
+            # These offer sets were counted "done" when the LLM call
+            # succeeded, but their result never reached disk — they will be
+            # retried on the next run.
+            for result_path, exc in writer.failures:
+                print(f"  Error writing {result_path}: {exc}")
+            run -= len(writer.failures)
+            failed += len(writer.failures)
+            print(f"\n{len(writer.failures)} result write(s) failed — adjusted totals below.")
+
+    if limit is not None and run + failed >= limit:
+        print(f"\nLimit of {limit} new inferences reached.")
 
     total_done = completed + run
     print(f"\nFinished. {run} new, {completed} already done, {failed} failed. Total: {total_done}/{n_total}")
@@ -255,11 +534,26 @@ if __name__ == "__main__":
     )
     parser.add_argument("--k", type=int, default=5, help="Consideration set size (default: 5)")
     parser.add_argument("--results-dir", default=None, help="Override results directory")
-    parser.add_argument("--limit", type=int, default=None, help="Stop after N new inferences (for testing)")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="Attempt at most N new inferences (for testing)")
     parser.add_argument(
         "--variant", default="full", choices=VARIANTS,
         help="Prompt variant for ablation study (default: full)",
     )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Concurrent inferences (default: 1; keep at 1 on free-tier rate limits)",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Bypass the on-disk response cache and always call the API",
+    )
+    parser.add_argument(
+        "--batch-k", type=int, default=1,
+        help="Offer sets per LLM request (default: 1). Values >1 amortize "
+             "instruction tokens across offer sets; size against the model's "
+             "context window (~10k tokens per full-variant offer set)",
+    )
 
     args = parser.parse_args()
     run_universe(
@@ -269,4 +563,7 @@ if __name__ == "__main__":
         results_dir=args.results_dir,
         limit=args.limit,
         variant=args.variant,
+        workers=args.workers,
+        use_cache=not args.no_cache,
+        batch_k=args.batch_k,
     )